@@ -2,7 +2,9 @@ from PyQt5 import QtWidgets as Qw
 from PyQt5 import QtCore as Qc
 from PyQt5.QtGui import QIcon
 
-from GUI.functions import create_dad_dataframe, export_wavelength
+import numpy as np
+
+from GUI.functions import create_dad_dataframe, export_wavelength, load_archive, read_archive_frame, ArchiveRun
 
 
 class DataTab(Qw.QWidget):
@@ -10,6 +12,8 @@ class DataTab(Qw.QWidget):
         super().__init__()
         self.initUI()
         self.dadDf = None
+        self.archive = None
+        self.runInfo = None
 
     def initUI(self):
         self.setStyleSheet('font-size: 9pt')
@@ -18,6 +22,7 @@ class DataTab(Qw.QWidget):
 
         self.openBtn = Qw.QPushButton('Open DAD.uv')
         self.openBtn.setFixedWidth(110)
+        self.openBtn.setToolTip('Open Agilent DAD.uv file or LCxLC archive')
         self.openBtn.clicked.connect(self.getUVPath)
 
         self.loadDataBtn = Qw.QPushButton('Load data')
@@ -74,7 +79,7 @@ class DataTab(Qw.QWidget):
 
         self.uvPath = Qw.QFileDialog.getOpenFileName(parent=self,
                                                      caption='Select a dad uv file',
-                                                     filter='Agilent DAD (*.UV)')
+                                                     filter='Agilent DAD (*.UV);;LCxLC archive (*.lcxlc)')
 
         if self.uvPath[0] != '':
             self.DADuvFilepath.setText(self.uvPath[0])
@@ -104,22 +109,28 @@ class DataTab(Qw.QWidget):
     def showOverview(self):
 
         self.dadDf = self.loadingThread.dadDf
-        col_num = len(self.dadDf.columns)
-        row_num = len(self.dadDf)
+        self.archive = self.loadingThread.archive
+        self.runInfo = self.loadingThread.runInfo
+
+        # for archives only the beginning of the run is read
+        overview_df = self.loadingThread.overviewDf
+
+        col_num = len(overview_df.columns)
+        row_num = len(overview_df)
 
         if row_num > 500:
             row_num = 500
 
         self.dfTable.setColumnCount(col_num)
         self.dfTable.setRowCount(row_num)
-        self.colNames = [str(num) for num in self.dadDf.columns]
+        self.colNames = [str(num) for num in overview_df.columns]
         self.dfTable.setHorizontalHeaderLabels(self.colNames)
 
         for i in range(row_num):
-            self.dfTable.setItem(i, 0, Qw.QTableWidgetItem(str(round(self.dadDf.iat[i, 0], ndigits=4))))
+            self.dfTable.setItem(i, 0, Qw.QTableWidgetItem(str(round(overview_df.iat[i, 0], ndigits=4))))
 
             for j in range(1, col_num):
-                self.dfTable.setItem(i, j, Qw.QTableWidgetItem(str(round(self.dadDf.iat[i, j], ndigits=1))))
+                self.dfTable.setItem(i, j, Qw.QTableWidgetItem(str(round(overview_df.iat[i, j], ndigits=1))))
 
         self.dfTable.resizeColumnsToContents()
 
@@ -139,7 +150,7 @@ class DataTab(Qw.QWidget):
         selected_wavelength = self.wavelengths.currentItem().text()
 
         if fp[0] != '':
-            export_wavelength(self.dadDf, int(selected_wavelength), fp[0])
+            export_wavelength(self.getRun(), int(selected_wavelength), fp[0])
 
     def exportAll(self):
 
@@ -147,9 +158,23 @@ class DataTab(Qw.QWidget):
                                             caption='UV Export',
                                             filter='tab-separated values (*.tsv)')
 
-        if (fp[0] != '') and (self.dadDf is not None):
+        if (fp[0] != '') and (self.getRun() is not None):
+
+            # whole archive is only read for the export, the run stays lazy
+            if self.dadDf is not None:
+                dad_df = self.dadDf
+            else:
+                dad_df = load_archive(self.archive.path)[0]
 
-            self.dadDf.to_csv(fp[0], sep='\t', index=False)
+            dad_df.to_csv(fp[0], sep='\t', index=False)
+
+    # data frame of DAD.uv files, ArchiveRun of archives which are read lazily
+    def getRun(self):
+
+        if self.dadDf is not None:
+            return self.dadDf
+
+        return self.archive
 
 
 class LoadingThread(Qc.QThread):
@@ -157,9 +182,22 @@ class LoadingThread(Qc.QThread):
         super().__init__()
         self.fp = fpath
         self.dadDf = None
+        self.archive = None
+        self.runInfo = None
+        self.overviewDf = None
 
     def run(self):
-        self.dadDf = create_dad_dataframe(self.fp)
+        # archives also contain the plot parameters of the run, only header and first modulations are read
+        if self.fp.lower().endswith('.lcxlc'):
+            self.archive = ArchiveRun(self.fp)
+            self.runInfo = self.archive.info()
+
+            # modulations for first 500 rows of the overview table
+            num_mod = np.ceil(500 / max(self.runInfo['dim_y'], 1))
+            self.overviewDf = read_archive_frame(self.fp, 0, (num_mod - 0.5) * self.runInfo['mod_time'])
+        else:
+            self.dadDf = create_dad_dataframe(self.fp)
+            self.overviewDf = self.dadDf
 
 
 class MessageWindow(Qw.QWidget):
@@ -3,9 +3,15 @@ import pandas as pd
 import numpy as np
 
 import os
+import json
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from scipy import ndimage
 import matplotlib.pyplot as plt
 import matplotlib.image as mgimg
 from matplotlib import animation
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_pdf import PdfPages
 
 
 # Parse Agilent DAD.uv file
@@ -22,24 +28,81 @@ def create_dad_dataframe(path):
     return df_dad
 
 
+# a run is either the data frame of create_dad_dataframe or an ArchiveRun of an archive of export_archive,
+# archives are read lazily, one wavelength at a time
+def run_retention_time(run):
+
+    if isinstance(run, ArchiveRun):
+        return run.retention_time()
+
+    return run['RT.min'].values
+
+
+def run_wavelengths(run):
+
+    if isinstance(run, ArchiveRun):
+        return run.wavelengths()
+
+    return list(run.columns[1:])
+
+
+def run_intensity(run, wavelength):
+
+    if isinstance(run, ArchiveRun):
+        return run.intensity(wavelength)
+
+    return run[wavelength].values
+
+
+# matrix of archives saved with the same parameters, None if it has to be reshaped from the intensities
+def run_stored_matrix(run, wavelength, mod_time, sample_rate):
+
+    if isinstance(run, ArchiveRun) and run.matches(mod_time, sample_rate):
+        return run.matrix(wavelength)
+
+    return None
+
+
+# points after the last full modulation of archives saved with the same parameters, None otherwise
+def run_stored_rest(run, wavelength, mod_time, sample_rate):
+
+    if isinstance(run, ArchiveRun) and run.matches(mod_time, sample_rate):
+        return run.rest(wavelength)
+
+    return None
+
+
 # export retention time and absorption of dad
-def export_wavelength(dad_df, wavelength, fn_out):
+def export_wavelength(run, wavelength, fn_out):
 
-    subset = dad_df[["RT.min", wavelength]]
-    subset.to_csv(fn_out, index=False, header=["RT", "DAD"], sep="\t")
+    subset = pd.DataFrame({'RT': run_retention_time(run), 'DAD': run_intensity(run, wavelength)})
+    subset.to_csv(fn_out, index=False, sep="\t")
 
 
-# reshape intensity array to matrix
-def intensity_matrix(df_dad1, wavelength, mod_time, sample_rate):
+# number of modulations and data points per modulation
+def matrix_dimensions(run, mod_time, sample_rate):
 
-    run_time = np.round(df_dad1['RT.min'].values[-1], decimals=1)
+    run_time = np.round(run_retention_time(run)[-1], decimals=1)
 
     dim_x = int(np.floor(run_time / mod_time))
     dim_y = int(np.floor(mod_time * sample_rate))
 
+    return dim_x, dim_y
+
+
+# reshape intensity array to matrix
+def intensity_matrix(run, wavelength, mod_time, sample_rate):
+
+    dim_x, dim_y = matrix_dimensions(run, mod_time, sample_rate)
+
+    # archives already contain the matrix, if it was saved with the same parameters
+    matrix = run_stored_matrix(run, wavelength, mod_time, sample_rate)
+    if matrix is not None:
+        return matrix, dim_x, dim_y
+
     num_data = dim_x * dim_y
 
-    intensity = df_dad1[wavelength].values
+    intensity = run_intensity(run, wavelength)
 
     # if less data points, then fill up with 0
     if num_data > len(intensity):
@@ -54,6 +117,51 @@ def intensity_matrix(df_dad1, wavelength, mod_time, sample_rate):
     return raw_2d, dim_x, dim_y
 
 
+# colorbar limits of all wavelengths as percentiles of all plotted intensities in one pass over the wavelengths
+# every wavelength is reduced to a histogram, percentiles are read from the sum of their cumulative histograms,
+# so only one wavelength at a time is in memory. Shifting does not change the intensities, so it is not needed here
+def color_limits(run, mod_time, sample_rate, inty_scale, lower=0.0, upper=100.0, bins=4096):
+
+    histograms = []
+    total_min = np.inf
+    total_max = -np.inf
+
+    for wavelength in run_wavelengths(run):
+        matrix, dim_x, dim_y = intensity_matrix(run, wavelength, mod_time, sample_rate)
+
+        if matrix.size == 0:
+            continue
+
+        low = np.min(matrix)
+        high = np.max(matrix)
+
+        # relative intensities, constant channels have none and are skipped
+        if inty_scale == 'relative':
+            if high == low:
+                continue
+            matrix = (matrix - low) * 100 / (high - low)
+            low, high = 0.0, 100.0
+
+        counts, edges = np.histogram(matrix, bins=bins, range=(low, high))
+        histograms.append((edges, np.append(0, np.cumsum(counts))))
+
+        total_min = min(total_min, low)
+        total_max = max(total_max, high)
+
+    if len(histograms) == 0:
+        return None, None
+
+    grid = np.linspace(total_min, total_max, num=bins * 16)
+    cumulative = np.zeros(len(grid))
+    for edges, cum_counts in histograms:
+        cumulative += np.interp(grid, edges, cum_counts)
+
+    bar_min = total_min if lower <= 0 else np.interp(lower / 100 * cumulative[-1], cumulative, grid)
+    bar_max = total_max if upper >= 100 else np.interp(upper / 100 * cumulative[-1], cumulative, grid)
+
+    return float(bar_min), float(bar_max)
+
+
 def shift_intensity_matrix(matrix, shift_time, sample_rate):
 
     shift_idx = int(np.round(sample_rate * shift_time, decimals=0))
@@ -66,14 +174,203 @@ def shift_intensity_matrix(matrix, shift_time, sample_rate):
     return matrix_shifted
 
 
-def calc_axis(retention_time_array, dim_x, dim_y):
+# reshape, scale and shift intensities of one wavelength like they are plotted
+def prepare_matrix(run, wavelength, mod_time, sample_rate, shift_time, inty_scale):
+
+    matrix, dim_x, dim_y = intensity_matrix(run, wavelength, mod_time, sample_rate)
+
+    # relative intensities
+    if inty_scale == 'relative':
+        matrix = matrix - np.min(matrix)
+        matrix = np.round(matrix * 100 / np.max(matrix), decimals=2)
+
+    if shift_time != 0:
+        matrix = np.asarray(shift_intensity_matrix(matrix, shift_time, sample_rate))
+
+    return matrix, dim_x, dim_y
+
+
+# combine bin_x x bin_y neighbouring points to one point by their mean or maximum, left over points are cut off
+def rebin_matrix(matrix, bin_x, bin_y, mode='mean'):
+
+    matrix = np.asarray(matrix)
+
+    # bins cannot be larger than the matrix
+    bin_x = max(min(bin_x, matrix.shape[0]), 1)
+    bin_y = max(min(bin_y, matrix.shape[1]), 1)
+
+    if bin_x == 1 and bin_y == 1:
+        return matrix
+
+    dim_x = matrix.shape[0] // bin_x
+    dim_y = matrix.shape[1] // bin_y
+
+    blocks = matrix[0:dim_x * bin_x, 0:dim_y * bin_y].reshape(dim_x, bin_x, dim_y, bin_y)
+
+    if mode == 'max':
+        return blocks.max(axis=(1, 3))
+
+    return blocks.mean(axis=(1, 3))
+
+
+# axis of the points (or with edges=True of the cell borders for pixmaps) of a rebinned matrix
+def calc_axis(retention_time_array, dim_x, dim_y, bin_x=1, bin_y=1, edges=False):
     run_time = np.round(retention_time_array[-1], decimals=0)
-    y, x = np.meshgrid(retention_time_array[0:dim_y]*60, np.linspace(0, run_time, num=dim_x))
+
+    # bins cannot be larger than the matrix, same as in rebin_matrix
+    bin_x = max(min(bin_x, dim_x), 1)
+    bin_y = max(min(bin_y, dim_y), 1)
+
+    num_x = dim_x // bin_x
+    num_y = dim_y // bin_y
+
+    if edges:
+        axis_x = np.linspace(0, run_time, num=dim_x + 1)[0:num_x * bin_x + 1:bin_x]
+        axis_y = retention_time_array[0:num_y * bin_y + 1:bin_y] * 60
+    else:
+        axis_x = np.linspace(0, run_time, num=dim_x)[0:num_x * bin_x].reshape(num_x, bin_x).mean(axis=1)
+        axis_y = retention_time_array[0:num_y * bin_y].reshape(num_y, bin_y).mean(axis=1) * 60
+
+    y, x = np.meshgrid(axis_y, axis_x)
 
     return x, y
 
 
-def plot2d(matrix, x, y, title, colormap, width, height, fn_out, inty_scale, bar_min=None, bar_max=None):
+# raw row of the data frame for every point of the (shifted) matrix, zero padded points are -1
+def coordinate_index(dim_x, dim_y, shift_time, sample_rate, num_rows):
+
+    shift_idx = int(np.round(sample_rate * shift_time, decimals=0))
+
+    # np.roll moves column j to j + shift_idx
+    cols = (np.arange(dim_y) - shift_idx) % dim_y
+    index = np.arange(dim_x)[:, None] * dim_y + cols[None, :]
+    index[index >= num_rows] = -1
+
+    return index
+
+
+# matrix index of a position in the plot, axis are evenly spaced so no search is needed
+# x and y are the points of calc_axis (closest point) or with edges=True the cell borders of a pixmap (enclosing cell)
+def lookup_point(x, y, x_pos, y_pos, edges=False):
+
+    num_x = x.shape[0] - 1 if edges else x.shape[0]
+    num_y = y.shape[1] - 1 if edges else y.shape[1]
+
+    step_x = (x[-1, 0] - x[0, 0]) / max(x.shape[0] - 1, 1)
+    step_y = (y[0, -1] - y[0, 0]) / max(y.shape[1] - 1, 1)
+
+    snap = np.floor if edges else np.round
+
+    i = int(np.clip(snap((x_pos - x[0, 0]) / step_x), 0, num_x - 1)) if step_x != 0 else 0
+    j = int(np.clip(snap((y_pos - y[0, 0]) / step_y), 0, num_y - 1)) if step_y != 0 else 0
+
+    return i, j
+
+
+# peaks are seeded at local maxima above threshold, connected regions above threshold are split between their
+# seeds by flooding from the seeds (watershed), so co-eluting peaks get their own apex and volume
+# noise maxima also become seeds, their small regions are removed with min_size
+# with wrap=True the 2D axis is periodic, so peaks crossing the border of a shifted matrix are not split
+def find_peaks_2d(matrix, x, y, threshold, min_size=1, wrap=False, size=3):
+
+    matrix = np.asarray(matrix, dtype=float)
+    dim_y = matrix.shape[1]
+
+    # two periods side by side, only peaks with apex in the middle period are kept
+    if wrap:
+        work = np.concatenate([matrix, matrix], axis=1)
+    else:
+        work = matrix
+
+    mask = work >= threshold
+
+    # neighbouring maxima of the same height (plateaus) are one seed
+    seeds = mask & (work == ndimage.maximum_filter(work, size=size))
+    markers, num_labels = ndimage.label(seeds, structure=np.ones((3, 3)))
+
+    if num_labels == 0:
+        return np.empty((0, 5))
+
+    # flooding cost is the inverted intensity, points below threshold are most expensive
+    span = np.max(work) - threshold
+    cost = np.full(work.shape, 65535, dtype=np.uint16)
+    if span > 0:
+        cost[mask] = np.round((np.max(work) - work[mask]) / span * 65534).astype(np.uint16)
+    else:
+        cost[mask] = 0
+
+    labels = ndimage.watershed_ift(cost, markers)
+    labels[~mask] = 0
+
+    idx = np.arange(1, num_labels + 1)
+
+    sizes = np.bincount(labels.ravel(), minlength=num_labels + 1)[1:]
+    heights = ndimage.maximum(work, labels, idx)
+    apex = np.asarray(ndimage.maximum_position(work, labels, idx), dtype=int)
+
+    # volume = summed intensity times area of one data point (min * s)
+    pixel_area = np.abs((x[-1, 0] - x[0, 0]) / max(len(x) - 1, 1) * (y[0, -1] - y[0, 0]) / max(len(y[0]) - 1, 1))
+    volumes = ndimage.sum(work, labels, idx) * pixel_area
+
+    keep = sizes >= min_size
+
+    if wrap:
+        middle = dim_y // 2
+        keep &= (apex[:, 1] >= middle) & (apex[:, 1] < middle + dim_y)
+        apex[:, 1] = apex[:, 1] % dim_y
+
+    peaks = np.column_stack([x[apex[:, 0], apex[:, 1]], y[apex[:, 0], apex[:, 1]],
+                             heights, volumes, sizes])
+
+    return peaks[keep]
+
+
+def _wavelength_peaks(args):
+
+    run, wavelength, mod_time, sample_rate, rt_array, shift_time, inty_scale, threshold, min_size = args
+
+    matrix, dim_x, dim_y = prepare_matrix(run, wavelength, mod_time, sample_rate, shift_time, inty_scale)
+    x, y = calc_axis(rt_array, dim_x, dim_y)
+
+    peaks = find_peaks_2d(matrix, x, y, threshold, min_size, wrap=shift_time != 0)
+
+    return np.column_stack([peaks[:, 0:2], np.full(len(peaks), wavelength), peaks[:, 2:4]])
+
+
+# find peaks of all wavelengths with a pool of worker threads
+def peak_table(run, mod_time, sample_rate, rt_array, shift_time, inty_scale, threshold, min_size=1,
+               wavelengths=None, workers=None):
+
+    if wavelengths is None:
+        wavelengths = run_wavelengths(run)
+
+    jobs = [(run, wavelength, mod_time, sample_rate, rt_array, shift_time, inty_scale, threshold, min_size)
+            for wavelength in wavelengths]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_wavelength_peaks, jobs))
+
+    columns = ['1D time [min]', '2D time [s]', 'wavelength [nm]', 'height', 'volume']
+
+    if len(results) == 0:
+        return pd.DataFrame(columns=columns)
+
+    table = pd.DataFrame(np.concatenate(results), columns=columns)
+    table['wavelength [nm]'] = table['wavelength [nm]'].astype(int)
+
+    return table
+
+
+# export peak table
+def export_peaks(peak_df, fn_out):
+
+    peak_df.to_csv(fn_out, index=False, sep="\t")
+
+
+# contour plot (or with pixmap=True pcolormesh with x and y as cell borders) as figure without pyplot,
+# so figures can be created in worker threads
+def create_figure(matrix, x, y, title, colormap, width, height, inty_scale, bar_min=None, bar_max=None,
+                  pixmap=False, colorbar=True, peaks=None):
 
     if bar_min is None:
         bar_min = np.min(matrix)
@@ -81,21 +378,283 @@ def plot2d(matrix, x, y, title, colormap, width, height, fn_out, inty_scale, bar
     if bar_max is None:
         bar_max = np.max(matrix)
 
-    fig, ax = plt.subplots(figsize=(width, height))
+    fig = Figure(figsize=(width, height))
+    ax = fig.add_subplot()
+
+    # intensities are drawn below the rasterization zorder, so vector files get them as image and axis as vector
+    ax.set_rasterization_zorder(0.5)
 
-    c = ax.contourf(x, y, matrix, cmap=colormap,
-                    vmin=bar_min,
-                    vmax=bar_max, levels=500)
+    if pixmap:
+        c = ax.pcolormesh(x, y, matrix, cmap=colormap, vmin=bar_min, vmax=bar_max, zorder=0)
+    else:
+        c = ax.contourf(x, y, matrix, cmap=colormap,
+                        vmin=bar_min,
+                        vmax=bar_max, levels=500, zorder=0)
     ax.axis([x.min(), x.max(), y.min(), y.max()])
-    ax.set_title(title)
+
+    if peaks is not None:
+        ax.scatter(peaks[:, 0], peaks[:, 1], marker='+', color='black')
+
+    if title is not None:
+        ax.set_title(title)
     ax.set_xlabel('1D time [min]')
     ax.set_ylabel('2D time [s]')
-    cbar = fig.colorbar(c, ax=ax)
 
-    if inty_scale == 'relative':
-        cbar.set_ticks([10, 20, 30, 40, 50, 60, 70, 80, 90])
+    if colorbar:
+        cbar = fig.colorbar(c, ax=ax)
+
+        if inty_scale == 'relative':
+            cbar.set_ticks([10, 20, 30, 40, 50, 60, 70, 80, 90])
+
+    return fig
+
+
+def plot2d(matrix, x, y, title, colormap, width, height, fn_out, inty_scale, bar_min=None, bar_max=None):
+
+    fig = create_figure(matrix, x, y, title, colormap, width, height, inty_scale, bar_min, bar_max)
+    fig.savefig(fn_out, bbox_inches="tight")
+
+
+def _wavelength_figure(args):
+
+    (run, wavelength, mod_time, sample_rate, rt_array, shift_time, colormap, width, height, inty_scale,
+     bar_min, bar_max, bin_x, bin_y, bin_mode) = args
+
+    matrix, dim_x, dim_y = prepare_matrix(run, wavelength, mod_time, sample_rate, shift_time, inty_scale)
+    matrix = rebin_matrix(matrix, bin_x, bin_y, bin_mode)
+    x, y = calc_axis(rt_array, dim_x, dim_y, bin_x, bin_y)
+
+    return create_figure(matrix, x, y, str(wavelength) + ' nm', colormap, width, height, inty_scale,
+                         bar_min, bar_max)
+
+
+# save plots of all (or selected) wavelengths as pages of one pdf file, contours are rasterized with dpi
+# figures are created by a pool of worker threads and written in order
+def export_pdf(run, fn_out, mod_time, sample_rate, rt_array, shift_time, colormap, width, height, inty_scale,
+               bar_min=None, bar_max=None, bin_x=1, bin_y=1, bin_mode='mean', dpi=300, wavelengths=None,
+               workers=None):
+
+    if wavelengths is None:
+        wavelengths = run_wavelengths(run)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    jobs = [(run, wavelength, mod_time, sample_rate, rt_array, shift_time, colormap, width, height, inty_scale,
+             bar_min, bar_max, bin_x, bin_y, bin_mode) for wavelength in wavelengths]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, PdfPages(fn_out) as pdf:
+
+        # only a few figures at once in memory
+        for start in range(0, len(jobs), workers):
+            for fig in pool.map(_wavelength_figure, jobs[start:start + workers]):
+                pdf.savefig(fig, dpi=dpi, bbox_inches="tight")
+
+
+# save run as archive: reshaped intensities of every wavelength in compressed chunks of chunk_rows modulations,
+# so single wavelengths or time windows can be read without decompressing the rest
+def export_archive(run, fn_out, mod_time, sample_rate, shift_time, chunk_rows=50):
+
+    wavelengths = run_wavelengths(run)
+    rt_array = run_retention_time(run)
+
+    dim_x, dim_y = matrix_dimensions(run, mod_time, sample_rate)
+    num_data = dim_x * dim_y
+    num_chunks = int(np.ceil(dim_x / chunk_rows))
+
+    meta = dict({'version': 1,
+                 'mod_time': mod_time,
+                 'sample_rate': sample_rate,
+                 'shift_time': shift_time,
+                 'dim_x': dim_x,
+                 'dim_y': dim_y,
+                 'num_rows': len(rt_array),
+                 'chunk_rows': chunk_rows,
+                 'num_chunks': num_chunks,
+                 'wavelengths': [int(wl) for wl in wavelengths]})
+
+    arrays = dict({'meta': np.array(json.dumps(meta)),
+                   'rt': rt_array})
+
+    for i, wavelength in enumerate(wavelengths):
+        matrix, dim_x, dim_y = intensity_matrix(run, wavelength, mod_time, sample_rate)
+
+        for k in range(num_chunks):
+            arrays['wl%i_chunk%i' % (i, k)] = matrix[k * chunk_rows:(k + 1) * chunk_rows]
+
+        # points after the last full modulation, not plotted but kept to restore the data frame
+        rest = run_stored_rest(run, wavelength, mod_time, sample_rate)
+        if rest is None:
+            rest = run_intensity(run, wavelength)[num_data:]
+        arrays['wl%i_rest' % i] = rest
+
+    # run may be read from the archive which is overwritten, so it is written to a temporary file first
+    # file object, otherwise numpy appends .npz to the file name
+    fn_tmp = fn_out + '.tmp'
+    with open(fn_tmp, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(fn_tmp, fn_out)
+
+    read_archive_info.cache_clear()
+
+
+# header and retention time of an archive, cached because every lazy read needs them
+@lru_cache(maxsize=8)
+def read_archive_info(path):
+
+    with np.load(path) as archive:
+        meta = json.loads(str(archive['meta']))
+        rt_array = archive['rt']
+
+    return meta, rt_array
+
+
+# read reshaped intensities of one wavelength, only chunks overlapping the 1D time window are decompressed
+# returns matrix and index of its first modulation
+def read_archive_matrix(path, wavelength, start_time=None, end_time=None):
+
+    meta = read_archive_info(path)[0]
+
+    # no full modulation in run
+    if meta['dim_x'] == 0:
+        return np.empty((0, meta['dim_y'])), 0
+
+    i = meta['wavelengths'].index(int(wavelength))
+
+    first_row = 0 if start_time is None else int(np.floor(start_time / meta['mod_time']))
+    last_row = meta['dim_x'] - 1 if end_time is None else int(np.floor(end_time / meta['mod_time']))
+
+    first_row = int(np.clip(first_row, 0, meta['dim_x'] - 1))
+    last_row = int(np.clip(last_row, first_row, meta['dim_x'] - 1))
+
+    first_chunk = first_row // meta['chunk_rows']
+    last_chunk = last_row // meta['chunk_rows']
+
+    with np.load(path) as archive:
+        chunks = [archive['wl%i_chunk%i' % (i, k)] for k in range(first_chunk, last_chunk + 1)]
+
+    offset = first_chunk * meta['chunk_rows']
+    matrix = np.concatenate(chunks)[first_row - offset:last_row - offset + 1]
+
+    return matrix, first_row
+
+
+# read points after the last full modulation of one wavelength
+def read_archive_rest(path, wavelength):
+
+    meta = read_archive_info(path)[0]
+
+    i = meta['wavelengths'].index(int(wavelength))
+
+    with np.load(path) as archive:
+        rest = archive['wl%i_rest' % i]
+
+    return rest
+
+
+# read intensities of all wavelengths of one row of the data frame, only the chunk with the row is decompressed
+def read_archive_spectrum(path, row):
+
+    meta = read_archive_info(path)[0]
+
+    dim_y = meta['dim_y']
+    num_data = meta['dim_x'] * dim_y
+
+    spectrum = np.empty(len(meta['wavelengths']))
+
+    with np.load(path) as archive:
+        for i in range(len(meta['wavelengths'])):
+            if row < num_data:
+                modulation = row // dim_y
+                k = modulation // meta['chunk_rows']
+                chunk = archive['wl%i_chunk%i' % (i, k)]
+                spectrum[i] = chunk[modulation - k * meta['chunk_rows'], row % dim_y]
+            else:
+                spectrum[i] = archive['wl%i_rest' % i][row - num_data]
+
+    return spectrum
+
+
+# read raw intensities of one wavelength like the column of the data frame
+def read_archive_intensity(path, wavelength):
+
+    meta = read_archive_info(path)[0]
+
+    i = meta['wavelengths'].index(int(wavelength))
+
+    with np.load(path) as archive:
+        parts = [archive['wl%i_chunk%i' % (i, k)].ravel() for k in range(meta['num_chunks'])]
+        parts.append(archive['wl%i_rest' % i])
+
+    # remove zeros filled up by intensity_matrix
+    return np.concatenate(parts)[0:meta['num_rows']]
+
+
+# data frame of all wavelengths in the 1D time window, only overlapping chunks are decompressed
+def read_archive_frame(path, start_time=None, end_time=None):
+
+    meta, rt_array = read_archive_info(path)
+
+    columns = dict()
+    first_point = 0
+    for wavelength in meta['wavelengths']:
+        matrix, first_row = read_archive_matrix(path, wavelength, start_time, end_time)
+        first_point = first_row * meta['dim_y']
+
+        # remove zeros filled up by intensity_matrix
+        columns[wavelength] = matrix.ravel()[0:max(meta['num_rows'] - first_point, 0)]
+
+    df_dad = pd.DataFrame(columns)
+    df_dad.insert(0, 'RT.min', rt_array[first_point:first_point + len(df_dad)])
+
+    return df_dad
+
+
+# restore data frame of the whole archived run like create_dad_dataframe and the parameters of the run
+def load_archive(path):
+
+    meta, rt_array = read_archive_info(path)
+
+    columns = dict()
+    for wavelength in meta['wavelengths']:
+        columns[wavelength] = read_archive_intensity(path, wavelength)
+
+    df_dad = pd.DataFrame(columns)
+    df_dad.insert(0, 'RT.min', rt_array)
+
+    return df_dad, meta
+
+
+# lazy reader of an archive with the accessors of a run, header is read again after the archive was overwritten
+class ArchiveRun:
+    def __init__(self, path):
+        self.path = path
+
+    def info(self):
+        return read_archive_info(self.path)[0]
+
+    def retention_time(self):
+        return read_archive_info(self.path)[1]
+
+    def wavelengths(self):
+        return self.info()['wavelengths']
+
+    def intensity(self, wavelength):
+        return read_archive_intensity(self.path, wavelength)
+
+    # archive contains matrices reshaped with these parameters
+    def matches(self, mod_time, sample_rate):
+        info = self.info()
+        return info['mod_time'] == mod_time and info['sample_rate'] == sample_rate
+
+    def matrix(self, wavelength):
+        return read_archive_matrix(self.path, wavelength)[0]
+
+    def rest(self, wavelength):
+        return read_archive_rest(self.path, wavelength)
 
-    plt.savefig(fn_out, bbox_inches="tight")
+    def spectrum(self, row):
+        return read_archive_spectrum(self.path, row)
 
 
 def create_animation(plot_dir, width, height):
@@ -39,6 +39,15 @@ class AppWindow(Qw.QMainWindow):
 
         # copy dataframe to plot tab
         self.plotTab.dadDf = self.dataTab.dadDf
+        self.plotTab.archive = self.dataTab.archive
+        self.plotTab.spectra = None
+        self.plotTab.colorLimits.clear()
+
+        # parameters of archived runs
+        if self.dataTab.runInfo is not None:
+            self.plotTab.modTime.setText(str(self.dataTab.runInfo['mod_time']))
+            self.plotTab.sampleRate.setText(str(int(round(self.dataTab.runInfo['sample_rate'] / 60))))
+            self.plotTab.shift.setText(str(round(self.dataTab.runInfo['shift_time'] * 60, ndigits=4)))
 
         self.plotTab.wavelengthList.clear()
 
@@ -51,7 +60,7 @@ class AppWindow(Qw.QMainWindow):
 
         objects = [self.plotTab.figLayout, self.plotTab.parameterLayout,
                    self.plotTab.colorLayout, self.plotTab.saveLayout,
-                   self.plotTab.drawPlotBtn]
+                   self.plotTab.peakLayout, self.plotTab.drawPlotBtn]
 
         for obj in objects:
             obj.setEnabled(True)
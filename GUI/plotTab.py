@@ -3,12 +3,15 @@ from PyQt5 import QtCore as Qc
 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
 
 import matplotlib.pyplot as plt
 import numpy as np
 
 from GUI.dataTab import MessageWindow
-from GUI.functions import intensity_matrix, shift_intensity_matrix, calc_axis, plot2d, create_animation
+from GUI.functions import (prepare_matrix, rebin_matrix, calc_axis, plot2d, create_figure, export_pdf,
+                           color_limits, export_archive, create_animation, find_peaks_2d, peak_table, export_peaks,
+                           coordinate_index, lookup_point, run_retention_time, run_wavelengths)
 
 
 class PlotTab(Qw.QWidget):
@@ -16,6 +19,7 @@ class PlotTab(Qw.QWidget):
         super().__init__()
         self.initUI()
         self.dadDf = None
+        self.archive = None
         self.colorDict = dict({'Blue Red': 'RdBu_r',
                                 'Rainbow': 'jet',
                                 'Magma': 'magma',
@@ -23,8 +27,17 @@ class PlotTab(Qw.QWidget):
                                 'Grayscale': 'binary'})
         self.currentPlot = None
         self.plot2D.ax = None
-        self.matrix = None
         self.matrixModified = None
+        self.spectra = None
+        self.coordIndex = None
+        self.coordAxis = None
+        self.coordGrid = None
+        self.plotArgs = None
+        self.scaleDict = dict({'individual': None,
+                               'global': (0.0, 100.0),
+                               'percentile': (1.0, 99.5)})
+        self.colorLimits = dict()
+        self.colorLimitsThread = None
 
     def initUI(self):
         self.setStyleSheet('font-size: 9pt')
@@ -37,6 +50,7 @@ class PlotTab(Qw.QWidget):
 
         self.wavelengthList = Qw.QListWidget()
         self.wavelengthList.setFixedWidth(100)
+        self.wavelengthList.setSelectionMode(Qw.QAbstractItemView.ExtendedSelection)
         self.wavelengthList.itemClicked.connect(self.newWavelengthClicked)
 
         self.figSizeX = Qw.QSpinBox()
@@ -59,6 +73,24 @@ class PlotTab(Qw.QWidget):
         self.showTitle.setChecked(True)
         self.showTitle.stateChanged.connect(self.draw2DPlot)
 
+        self.binX = Qw.QSpinBox()
+        self.binX.setRange(1, 20)
+        self.binX.setValue(1)
+        self.binX.setFixedWidth(50)
+        self.binX.valueChanged.connect(self.draw2DPlot)
+
+        self.binY = Qw.QSpinBox()
+        self.binY.setRange(1, 20)
+        self.binY.setValue(1)
+        self.binY.setFixedWidth(50)
+        self.binY.valueChanged.connect(self.draw2DPlot)
+
+        self.binMode = Qw.QComboBox()
+        self.binMode.addItems(['mean', 'max'])
+        self.binMode.setCurrentIndex(0)
+        self.binMode.setFixedWidth(60)
+        self.binMode.currentTextChanged.connect(self.draw2DPlot)
+
         self.plotMode = Qw.QComboBox()
         self.plotMode.addItems(['Contour plot', 'Pixmap'])
         self.plotMode.setCurrentIndex(0)
@@ -87,13 +119,43 @@ class PlotTab(Qw.QWidget):
         self.intyScale.setFixedWidth(100)
         self.intyScale.currentTextChanged.connect(self.newWavelengthClicked)
 
+        self.colorScale = Qw.QComboBox()
+        self.colorScale.addItems(['individual', 'global', 'percentile'])
+        self.colorScale.setCurrentIndex(0)
+        self.colorScale.setFixedWidth(100)
+        self.colorScale.setToolTip('global: minimum and maximum of all wavelengths, '
+                                   'percentile: 1st and 99.5th percentile of all wavelengths')
+        self.colorScale.currentTextChanged.connect(self.newWavelengthClicked)
+
         self.showColorbar = Qw.QCheckBox()
         self.showColorbar.setChecked(True)
         self.showColorbar.stateChanged.connect(self.draw2DPlot)
 
+        self.peakThreshold = Qw.QLineEdit()
+        self.peakThreshold.setFixedWidth(80)
+        self.peakThreshold.editingFinished.connect(self.draw2DPlot)
+
+        self.peakMinSize = Qw.QSpinBox()
+        self.peakMinSize.setRange(1, 1000)
+        self.peakMinSize.setValue(5)
+        self.peakMinSize.setFixedWidth(60)
+        self.peakMinSize.setToolTip('Minimum number of data points of a peak, smaller peaks (noise) are removed')
+        self.peakMinSize.valueChanged.connect(self.draw2DPlot)
+
+        self.showPeaks = Qw.QCheckBox()
+        self.showPeaks.stateChanged.connect(self.draw2DPlot)
+
+        self.exportPeaksBtn = Qw.QPushButton('Export peaks')
+        self.exportPeaksBtn.setFixedWidth(100)
+        self.exportPeaksBtn.clicked.connect(self.savePeakTable)
+
         self.datapointsInfo = Qw.QLabel()
         self.plot2D = FigureCanvas()
 
+        self.spectrumPlot = FigureCanvas(Figure(figsize=(3, 3)))
+        self.spectrumPlot.ax = self.spectrumPlot.figure.add_subplot()
+        self.spectrumPlot.setFixedWidth(300)
+
         self.exportBtn = Qw.QPushButton('Current plot')
         self.exportBtn.setFixedWidth(100)
         self.exportBtn.clicked.connect(self.saveCurrentPlot)
@@ -102,6 +164,22 @@ class PlotTab(Qw.QWidget):
         self.exportAllBtn.setFixedWidth(100)
         self.exportAllBtn.clicked.connect(self.saveAllPlots)
 
+        self.exportPdfBtn = Qw.QPushButton('PDF')
+        self.exportPdfBtn.setFixedWidth(60)
+        self.exportPdfBtn.setToolTip('Save all plots (or the selected wavelengths) as one pdf file')
+        self.exportPdfBtn.clicked.connect(self.saveAllPlotsPdf)
+
+        self.pdfDpi = Qw.QSpinBox()
+        self.pdfDpi.setRange(50, 1200)
+        self.pdfDpi.setValue(300)
+        self.pdfDpi.setSingleStep(50)
+        self.pdfDpi.setFixedWidth(60)
+
+        self.archiveBtn = Qw.QPushButton('Archive')
+        self.archiveBtn.setFixedWidth(80)
+        self.archiveBtn.setToolTip('Save run with modulation time, sample rate and shift as LCxLC archive')
+        self.archiveBtn.clicked.connect(self.saveArchive)
+
         self.createGifBtn = Qw.QPushButton('Create GIF')
         self.createGifBtn.setFixedWidth(100)
         self.createGifBtn.clicked.connect(self.createGif)
@@ -124,6 +202,11 @@ class PlotTab(Qw.QWidget):
 
         fig_3 = Qw.QFormLayout()
         fig_3.addRow(self.tr("&Show title:"), self.showTitle)
+        fig_3.addRow(self.tr("&Binning:"), self.binMode)
+
+        fig_4 = Qw.QFormLayout()
+        fig_4.addRow(self.tr("&Bin 1D:"), self.binX)
+        fig_4.addRow(self.tr("&Bin 2D:"), self.binY)
 
         self.figLayout = Qw.QGroupBox("Figure")
         figure = Qw.QHBoxLayout()
@@ -132,6 +215,8 @@ class PlotTab(Qw.QWidget):
         figure.addLayout(fig_2)
         figure.addSpacing(20)
         figure.addLayout(fig_3)
+        figure.addSpacing(20)
+        figure.addLayout(fig_4)
         self.figLayout.setLayout(figure)
         self.figLayout.setEnabled(False)
 
@@ -148,6 +233,9 @@ class PlotTab(Qw.QWidget):
         color_3.addRow(self.tr("&Intensity:"), self.intyScale)
         color_3.addRow(self.tr("&Show colorbar:"), self.showColorbar)
 
+        color_4 = Qw.QFormLayout()
+        color_4.addRow(self.tr("&Scale:"), self.colorScale)
+
         self.colorLayout = Qw.QGroupBox("Colorbar")
         color = Qw.QHBoxLayout()
         color.addLayout(color_1)
@@ -155,6 +243,8 @@ class PlotTab(Qw.QWidget):
         color.addLayout(color_2)
         color.addSpacing(20)
         color.addLayout(color_3)
+        color.addSpacing(20)
+        color.addLayout(color_4)
         self.colorLayout.setLayout(color)
         self.colorLayout.setEnabled(False)
 
@@ -171,6 +261,10 @@ class PlotTab(Qw.QWidget):
         save = Qw.QHBoxLayout()
         save.addWidget(self.exportBtn)
         save.addWidget(self.exportAllBtn)
+        save.addWidget(self.exportPdfBtn)
+        save.addWidget(Qw.QLabel("dpi:"))
+        save.addWidget(self.pdfDpi)
+        save.addWidget(self.archiveBtn)
         save.addWidget(self.createGifBtn)
         save.addWidget(self.gifHelptext)
 
@@ -178,6 +272,24 @@ class PlotTab(Qw.QWidget):
         self.saveLayout.setLayout(save)
         self.saveLayout.setEnabled(False)
 
+        # Peaks
+        peak_1 = Qw.QFormLayout()
+        peak_1.addRow(self.tr("&Threshold:"), self.peakThreshold)
+        peak_1.addRow(self.tr("&Show peaks:"), self.showPeaks)
+
+        peak_2 = Qw.QFormLayout()
+        peak_2.addRow(self.tr("&Min. points:"), self.peakMinSize)
+
+        self.peakLayout = Qw.QGroupBox("Peaks")
+        peak = Qw.QHBoxLayout()
+        peak.addLayout(peak_1)
+        peak.addSpacing(20)
+        peak.addLayout(peak_2)
+        peak.addSpacing(20)
+        peak.addWidget(self.exportPeaksBtn)
+        self.peakLayout.setLayout(peak)
+        self.peakLayout.setEnabled(False)
+
         self.plotLayout = Qw.QGridLayout()
         self.plotLayout.setSpacing(20)
         self.plotLayout.setColumnMinimumWidth(0, 100)
@@ -191,8 +303,11 @@ class PlotTab(Qw.QWidget):
 
         self.plotLayout.addWidget(self.datapointsInfo, 1, 1, 1, 3)
         self.plotLayout.addWidget(self.plot2D, 2, 1, 1, 3)
+        self.plotLayout.addWidget(Qw.QLabel("Spectrum (click on plot)"), 1, 4)
+        self.plotLayout.addWidget(self.spectrumPlot, 2, 4)
 
-        self.plotLayout.addWidget(self.saveLayout, 3, 1, 1, 3)
+        self.plotLayout.addWidget(self.saveLayout, 3, 1, 1, 2)
+        self.plotLayout.addWidget(self.peakLayout, 3, 3)
 
         self.setLayout(self.plotLayout)
 
@@ -203,6 +318,14 @@ class PlotTab(Qw.QWidget):
             self.maxCutoff.clear()
         self.draw2DPlot()
 
+    # data frame of DAD.uv files, ArchiveRun of archives which are read lazily
+    def getRun(self):
+
+        if self.dadDf is not None:
+            return self.dadDf
+
+        return self.archive
+
     def getPlotParameters(self):
 
         shift_time = float(self.shift.text()) / 60  # in textbox time of shifting y-axis is given in seconds
@@ -215,10 +338,71 @@ class PlotTab(Qw.QWidget):
 
         cmap = self.colorDict[self.colormap.currentText()]
 
-        rt_array = self.dadDf['RT.min'].values
+        rt_array = run_retention_time(self.getRun())
 
         return shift_time, wavelength, time, srate, width, height, cmap, rt_array
 
+    def getColorLimitsKey(self):
+
+        shift_time, wavelength, mod_time, sample_rate, width, height, colormap, time_array = self.getPlotParameters()
+
+        # limits only change with parameters of reshaping and scaling, cache is cleared when new data is loaded
+        return mod_time, sample_rate, self.intyScale.currentText(), self.scaleDict[self.colorScale.currentText()]
+
+    def getGlobalColorLimits(self):
+
+        key = self.getColorLimitsKey()
+        mod_time, sample_rate, inty_mode, percentiles = key
+
+        if percentiles is None:
+            return None, None
+
+        if key in self.colorLimits:
+            return self.colorLimits[key]
+
+        # limits are computed in the background, plot is drawn again when they are ready
+        if self.colorLimitsThread is None or not self.colorLimitsThread.isRunning():
+            self.colorLimitsThread = ColorLimitsThread(self.getRun(), key)
+            self.colorLimitsThread.finished.connect(self.colorLimitsReady)
+            self.colorLimitsThread.start()
+
+        return None, None
+
+    def colorLimitsReady(self):
+
+        thread = self.sender()
+
+        # limits of data loaded before are dropped, plot is drawn again to compute limits of the current data
+        if thread.runData is self.getRun():
+            self.colorLimits[thread.key] = (thread.barMin, thread.barMax)
+
+        if not self.setColorbarFixed.isChecked():
+            self.minCutoff.clear()
+            self.maxCutoff.clear()
+        self.draw2DPlot()
+
+    # returns limits and the percentiles export threads still have to compute, if they are not cached yet
+    def getColorbarLimits(self):
+
+        if self.setColorbarFixed.isChecked():
+            return float(self.minCutoff.text()), float(self.maxCutoff.text()), None
+
+        key = self.getColorLimitsKey()
+        percentiles = key[3]
+
+        if percentiles is None:
+            return None, None, None
+
+        if key in self.colorLimits:
+            bar_min, bar_max = self.colorLimits[key]
+            return bar_min, bar_max, None
+
+        return None, None, percentiles
+
+    def getBinParameters(self):
+
+        return self.binX.value(), self.binY.value(), self.binMode.currentText()
+
     def draw2DPlot(self):
 
         if self.plot2D.ax is not None:
@@ -226,52 +410,73 @@ class PlotTab(Qw.QWidget):
 
         shift_time, wavelength, mod_time, sample_rate, width, height, colormap, time_array = self.getPlotParameters()
 
-        # reshape intensity array from data frame and get dimension of x and y-axis
-        self.matrix, dim_x, dim_y = intensity_matrix(self.dadDf, wavelength, mod_time, sample_rate)
+        # reshape intensity array from data frame, calculate relative intensities and shift y-axis
+        self.matrixModified, dim_x, dim_y = prepare_matrix(self.getRun(), wavelength, mod_time, sample_rate, shift_time,
+                                                           self.intyScale.currentText())
 
-        # calculate relative intensities
-        if self.intyScale.currentText() == 'relative':
-            self.matrixModified = self.matrix - np.min(self.matrix)
-            self.matrixModified = np.round(self.matrixModified * 100 / np.max(self.matrixModified), decimals=2)
+        # combine neighbouring points to reduce the number of plotted points
+        bin_x, bin_y, bin_mode = self.getBinParameters()
+        plot_matrix = rebin_matrix(self.matrixModified, bin_x, bin_y, bin_mode)
 
-        else:
-            self.matrixModified = self.matrix
+        # get minimum and maximum of colorbar, either of this plot or of all wavelengths
+        global_min, global_max = None, None
+        if self.minCutoff.text() == '' or self.maxCutoff.text() == '':
+            global_min, global_max = self.getGlobalColorLimits()
 
-        # shift of y-axis
-        if shift_time != 0:
-            self.matrixModified = shift_intensity_matrix(self.matrixModified, shift_time, sample_rate)
-
-        # get minimum and maximum of colorbar
         if self.minCutoff.text() == '':
-            bar_min = np.min(self.matrixModified)
+            bar_min = np.min(plot_matrix) if global_min is None else global_min
             self.minCutoff.setText(str(round(bar_min, ndigits=2)))
         else:
             bar_min = float(self.minCutoff.text())
 
         if self.maxCutoff.text() == '':
-            bar_max = np.max(self.matrixModified)
+            bar_max = np.max(plot_matrix) if global_max is None else global_max
             self.maxCutoff.setText(str(round(bar_max, ndigits=2)))
         else:
             bar_max = float(self.maxCutoff.text())
 
-        run_time = np.round(time_array[-1], decimals=0)
-
         # create plot
         self.plot2D.figure, self.plot2D.ax = plt.subplots(1, figsize=(width, height))
 
+        # intensities are rasterized in vector files like in create_figure
+        self.plot2D.ax.set_rasterization_zorder(0.5)
+
         if self.plotMode.currentText() == 'Contour plot':
-            y, x = np.meshgrid(time_array[0:dim_y] * 60, np.linspace(0, run_time, num=dim_x))
-            self.currentPlot = self.plot2D.ax.contourf(x, y, self.matrixModified,
+            x, y = calc_axis(time_array, dim_x, dim_y, bin_x, bin_y)
+            self.currentPlot = self.plot2D.ax.contourf(x, y, plot_matrix,
                                                        cmap=colormap, vmin= bar_min, vmax= bar_max,
-                                                       levels=500)
+                                                       levels=500, zorder=0)
         else:
-            y, x = np.meshgrid(time_array[0:dim_y+1] * 60, np.linspace(0, run_time, num=dim_x+1))
-            self.currentPlot = self.plot2D.ax.pcolormesh(x, y, self.matrixModified,
-                                                         cmap=colormap, vmin=bar_min, vmax=bar_max)
+            x, y = calc_axis(time_array, dim_x, dim_y, bin_x, bin_y, edges=True)
+            self.currentPlot = self.plot2D.ax.pcolormesh(x, y, plot_matrix,
+                                                         cmap=colormap, vmin=bar_min, vmax=bar_max, zorder=0)
 
         # set limits of axis
         self.plot2D.ax.axis([x.min(), x.max(), y.min(), y.max()])
 
+        axis_x, axis_y = calc_axis(time_array, dim_x, dim_y)
+
+        # mark apex of all peaks above threshold
+        peaks = None
+        if self.showPeaks.isChecked() and self.peakThreshold.text() != '':
+            peaks = find_peaks_2d(self.matrixModified, axis_x, axis_y, float(self.peakThreshold.text()),
+                                  self.peakMinSize.value(), wrap=shift_time != 0)
+            self.plot2D.ax.scatter(peaks[:, 0], peaks[:, 1], marker='+', color='black')
+
+        # map points of the plot back to rows of the data frame for the spectrum panel
+        # pixmap cells are found by their borders, contour points by their position
+        self.coordIndex = coordinate_index(dim_x, dim_y, shift_time, sample_rate, len(time_array))
+        self.coordAxis = (axis_x, axis_y)
+
+        if self.plotMode.currentText() == 'Contour plot':
+            self.coordGrid = (axis_x, axis_y, False)
+        else:
+            edge_x, edge_y = calc_axis(time_array, dim_x, dim_y, edges=True)
+            self.coordGrid = (edge_x, edge_y, True)
+
+        # figure is new with every plot, so the click event is connected again
+        self.plot2D.mpl_connect('button_press_event', self.drawSpectrum)
+
         if self.showTitle.isChecked():
             self.plot2D.ax.set_title(str(wavelength) + " nm")
 
@@ -284,19 +489,59 @@ class PlotTab(Qw.QWidget):
         self.plot2D.ax.set_ylabel("2D time [s]")
         self.plot2D.draw()
 
+        # parameters of the current plot, so it can be saved as pdf in a thread without the figure of the GUI
+        self.plotArgs = dict({'matrix': plot_matrix, 'x': x, 'y': y,
+                              'title': str(wavelength) + " nm" if self.showTitle.isChecked() else None,
+                              'colormap': colormap, 'width': width, 'height': height,
+                              'inty_scale': self.intyScale.currentText(), 'bar_min': bar_min, 'bar_max': bar_max,
+                              'pixmap': self.plotMode.currentText() != 'Contour plot',
+                              'colorbar': self.showColorbar.isChecked(), 'peaks': peaks})
+
         # print dim x, dim y and number of points, so user can check, if sample rate and modulation time fit together
         num_all_points = len(time_array)
         num_plot_points = dim_x * dim_y
+        num_binned_points = plot_matrix.shape[0] * plot_matrix.shape[1]
         diff = np.abs(num_plot_points - num_all_points)
         info_text = (("data points:     1st dim: %i" % dim_x) + ("      2nd dim: %i" % dim_y) +
                      ("     plotted: %i" % num_plot_points) + ("       all: %i" % num_all_points) +
-                     ("     difference: %i" % diff))
+                     ("     difference: %i" % diff) + ("     after binning: %i" % num_binned_points))
 
         self.datapointsInfo.setText(info_text)
 
         if self.currentPlot is not None:
             self.exportBtn.setEnabled(True)
 
+    def drawSpectrum(self, event):
+
+        if event.inaxes is not self.plot2D.ax or self.coordIndex is None:
+            return
+
+        grid_x, grid_y, edges = self.coordGrid
+        i, j = lookup_point(grid_x, grid_y, event.xdata, event.ydata, edges)
+        row = self.coordIndex[i, j]
+
+        if row < 0:
+            return
+
+        # all spectra of data frames as one array, so a click does not scan the data frame
+        # archives only read the chunks with the row
+        if self.dadDf is not None:
+            if self.spectra is None:
+                self.spectra = self.dadDf.iloc[:, 1:].to_numpy()
+            spectrum = self.spectra[row]
+        else:
+            spectrum = self.archive.spectrum(row)
+
+        wavelengths = np.asarray(run_wavelengths(self.getRun()), dtype=float)
+
+        self.spectrumPlot.ax.clear()
+        self.spectrumPlot.ax.plot(wavelengths, spectrum, color='black', linewidth=1)
+        self.spectrumPlot.ax.set_title("%.2f min  /  %.2f s" % (self.coordAxis[0][i, j], self.coordAxis[1][i, j]))
+        self.spectrumPlot.ax.set_xlabel("wavelength [nm]")
+        self.spectrumPlot.ax.set_ylabel("intensity")
+        self.spectrumPlot.figure.tight_layout()
+        self.spectrumPlot.draw()
+
     def saveCurrentPlot(self):
 
         file_filter = 'Portable Network Graphic (*.png);;JPEG (*.jpg);; Portable Document Format (*.pdf)'
@@ -309,11 +554,17 @@ class PlotTab(Qw.QWidget):
 
         if fname != '':
             if fname.endswith('.pdf'):
-                pdf_save = SavePlotThread(fname)
-                pdf_save.run()
+                if self.plotArgs is None:
+                    return
+
+                self.pdfSaveThread = SavePlotThread(fname, dict(self.plotArgs), self.pdfDpi.value())
+                self.msgWindow_pdf = MessageWindow('Saving plot...Please wait until this window closes.')
+                self.pdfSaveThread.finished.connect(self.msgWindow_pdf.close)
+                self.msgWindow_pdf.show()
+                self.pdfSaveThread.start()
 
             else:
-                plt.savefig(fname,  bbox_inches='tight')
+                self.plot2D.figure.savefig(fname, bbox_inches='tight')
 
     def saveAllPlots(self):
 
@@ -324,22 +575,93 @@ class PlotTab(Qw.QWidget):
 
             shift_time, wavelength, mod_time, sample_rate, width, height, colormap, time_array = self.getPlotParameters()
 
-            if self.setColorbarFixed.isChecked():
-                bar_min = float(self.minCutoff.text())
-                bar_max = float(self.maxCutoff.text())
-            else:
-                bar_min = None
-                bar_max = None
+            bar_min, bar_max, percentiles = self.getColorbarLimits()
 
             # retentionTime = np.append(0.0, retentionTime)
 
-            self.thread = CreatingAllPlotsThread(self.dadDf, dir_path, mod_time, sample_rate, time_array, shift_time,
-                                                 colormap, width, height, bar_min, bar_max, self.intyScale.currentText())
+            bin_x, bin_y, bin_mode = self.getBinParameters()
+
+            self.thread = CreatingAllPlotsThread(self.getRun(), dir_path, mod_time, sample_rate, time_array, shift_time,
+                                                 colormap, width, height, bar_min, bar_max, self.intyScale.currentText(),
+                                                 bin_x, bin_y, bin_mode, percentiles)
             self.msgWindow = MessageWindow('Saving all plots...Please wait until this window closes.')
             self.thread.finished.connect(self.msgWindow.close)
             self.msgWindow.show()
             self.thread.start()
 
+    def saveAllPlotsPdf(self):
+
+        path = Qw.QFileDialog.getSaveFileName(parent=self,
+                                              caption='Save all plots',
+                                              filter='Portable Document Format (*.pdf)')
+
+        fname = path[0]
+
+        if fname != '':
+
+            shift_time, wavelength, mod_time, sample_rate, width, height, colormap, time_array = self.getPlotParameters()
+
+            bar_min, bar_max, percentiles = self.getColorbarLimits()
+            bin_x, bin_y, bin_mode = self.getBinParameters()
+
+            # several selected wavelengths are saved in order of the list, otherwise all
+            selected = self.wavelengthList.selectedItems()
+            if len(selected) > 1:
+                selected.sort(key=self.wavelengthList.row)
+                wavelengths = [int(item.text()) for item in selected]
+            else:
+                wavelengths = None
+
+            self.pdfThread = SavePdfThread(self.getRun(), fname, mod_time, sample_rate, time_array, shift_time,
+                                           colormap, width, height, bar_min, bar_max, self.intyScale.currentText(),
+                                           bin_x, bin_y, bin_mode, self.pdfDpi.value(), wavelengths, percentiles)
+            self.msgWindow_pdf = MessageWindow('Saving pdf...Please wait until this window closes.')
+            self.pdfThread.finished.connect(self.msgWindow_pdf.close)
+            self.msgWindow_pdf.show()
+            self.pdfThread.start()
+
+    def saveArchive(self):
+
+        path = Qw.QFileDialog.getSaveFileName(parent=self,
+                                              caption='Save archive',
+                                              filter='LCxLC archive (*.lcxlc)')
+
+        fname = path[0]
+
+        if fname != '':
+
+            if not fname.lower().endswith('.lcxlc'):
+                fname = fname + '.lcxlc'
+
+            shift_time, wavelength, mod_time, sample_rate, width, height, colormap, time_array = self.getPlotParameters()
+
+            self.archiveThread = ArchiveThread(self.getRun(), fname, mod_time, sample_rate, shift_time)
+            self.msgWindow_archive = MessageWindow('Saving archive...Please wait until this window closes.')
+            self.archiveThread.finished.connect(self.msgWindow_archive.close)
+            self.msgWindow_archive.show()
+            self.archiveThread.start()
+
+    def savePeakTable(self):
+
+        if self.peakThreshold.text() == '':
+            return
+
+        fp = Qw.QFileDialog.getSaveFileName(parent=self,
+                                            caption='Peak Export',
+                                            filter='tab-separated values (*.tsv)')
+
+        if fp[0] != '':
+
+            shift_time, wavelength, mod_time, sample_rate, width, height, colormap, time_array = self.getPlotParameters()
+
+            self.peakThread = PeakTableThread(self.getRun(), fp[0], mod_time, sample_rate, time_array, shift_time,
+                                              self.intyScale.currentText(), float(self.peakThreshold.text()),
+                                              self.peakMinSize.value())
+            self.msgWindow_peaks = MessageWindow('Finding peaks...Please wait until this window closes.')
+            self.peakThread.finished.connect(self.msgWindow_peaks.close)
+            self.msgWindow_peaks.show()
+            self.peakThread.start()
+
     def createGif(self):
 
         dir_path = Qw.QFileDialog.getExistingDirectory(parent=self,
@@ -358,10 +680,11 @@ class PlotTab(Qw.QWidget):
 
 
 class CreatingAllPlotsThread(Qc.QThread):
-    def __init__(self, dad_df, dir_out, mod_time, sample_rate, rt_array, shift_time,
-                 colormap, width, height, bar_min, bar_max, inty_mode):
+    def __init__(self, run_data, dir_out, mod_time, sample_rate, rt_array, shift_time,
+                 colormap, width, height, bar_min, bar_max, inty_mode, bin_x=1, bin_y=1, bin_mode='mean',
+                 percentiles=None):
         super().__init__()
-        self.dadDf = dad_df
+        self.runData = run_data
         self.dirPath = dir_out
         self.modTime = mod_time
         self.sampleRate = sample_rate
@@ -373,28 +696,76 @@ class CreatingAllPlotsThread(Qc.QThread):
         self.barMin = bar_min
         self.barMax = bar_max
         self.intyScale = inty_mode
+        self.binX = bin_x
+        self.binY = bin_y
+        self.binMode = bin_mode
+        self.percentiles = percentiles
 
     def run(self):
-        for wavelength in self.dadDf.columns[1:]:
+        # global limits which were not computed yet
+        if self.percentiles is not None:
+            self.barMin, self.barMax = color_limits(self.runData, self.modTime, self.sampleRate, self.intyScale,
+                                                    self.percentiles[0], self.percentiles[1])
+
+        for wavelength in run_wavelengths(self.runData):
 
             fp = self.dirPath + '/' + str(wavelength) + ".png"
 
             title = str(wavelength) + ' nm'
 
-            matrix, dim_x, dim_y = intensity_matrix(self.dadDf, wavelength, self.modTime, self.sampleRate)
-            x, y = calc_axis(self.retentionTime, dim_x, dim_y)
-
-            # relative intensities
-            if self.intyScale == 'relative':
-                matrix = matrix - np.min(matrix)
-                matrix = np.round(matrix * 100 / np.max(matrix), decimals=2)
-
-            if self.shiftTime != 0:
-                matrix = shift_intensity_matrix(matrix, self.shiftTime, self.sampleRate)
+            matrix, dim_x, dim_y = prepare_matrix(self.runData, wavelength, self.modTime, self.sampleRate,
+                                                  self.shiftTime, self.intyScale)
+            matrix = rebin_matrix(matrix, self.binX, self.binY, self.binMode)
+            x, y = calc_axis(self.retentionTime, dim_x, dim_y, self.binX, self.binY)
 
             plot2d(matrix, x, y, title, self.colormap, self.width, self.height, fp, self.intyScale, self.barMin,
                    self.barMax)
-            plt.close()
+
+
+class ColorLimitsThread(Qc.QThread):
+    def __init__(self, run_data, key):
+        super().__init__()
+        self.runData = run_data
+        self.key = key
+        self.barMin = None
+        self.barMax = None
+
+    def run(self):
+        mod_time, sample_rate, inty_mode, percentiles = self.key
+        self.barMin, self.barMax = color_limits(self.runData, mod_time, sample_rate, inty_mode,
+                                                percentiles[0], percentiles[1])
+
+
+class PeakTableThread(Qc.QThread):
+    def __init__(self, run_data, fn_out, mod_time, sample_rate, rt_array, shift_time, inty_mode, threshold, min_size):
+        super().__init__()
+        self.runData = run_data
+        self.filepath = fn_out
+        self.modTime = mod_time
+        self.sampleRate = sample_rate
+        self.retentionTime = rt_array
+        self.shiftTime = shift_time
+        self.intyScale = inty_mode
+        self.threshold = threshold
+        self.minSize = min_size
+
+    def run(self):
+        peaks = peak_table(self.runData, self.modTime, self.sampleRate, self.retentionTime, self.shiftTime,
+                           self.intyScale, self.threshold, self.minSize)
+        export_peaks(peaks, self.filepath)
+
+
+class ArchiveThread(Qc.QThread):
+    def __init__(self, run_data, fn_out, mod_time, sample_rate, shift_time):
+        super().__init__()
+        self.runData = run_data
+        self.filepath = fn_out
+        self.modTime = mod_time
+        self.sampleRate = sample_rate
+        self.shiftTime = shift_time
+
+    def run(self):
+        export_archive(self.runData, self.filepath, self.modTime, self.sampleRate, self.shiftTime)
 
 
 class CreateGIFThread(Qc.QThread):
@@ -408,15 +779,53 @@ class CreateGIFThread(Qc.QThread):
         create_animation(self.dirPath, self.width, self.height)
 
 
-# if plot mode is set to Pixmap, plot can be saved as pdf file. If contour plot, the pdf size will be too big to save
+class SavePdfThread(Qc.QThread):
+    def __init__(self, run_data, fn_out, mod_time, sample_rate, rt_array, shift_time, colormap, width, height,
+                 bar_min, bar_max, inty_mode, bin_x, bin_y, bin_mode, dpi, wavelengths=None, percentiles=None):
+        super().__init__()
+        self.runData = run_data
+        self.filepath = fn_out
+        self.modTime = mod_time
+        self.sampleRate = sample_rate
+        self.retentionTime = rt_array
+        self.shiftTime = shift_time
+        self.colormap = colormap
+        self.width = width
+        self.height = height
+        self.barMin = bar_min
+        self.barMax = bar_max
+        self.intyScale = inty_mode
+        self.binX = bin_x
+        self.binY = bin_y
+        self.binMode = bin_mode
+        self.dpi = dpi
+        self.wavelengths = wavelengths
+        self.percentiles = percentiles
+
+    def run(self):
+        # global limits which were not computed yet
+        if self.percentiles is not None:
+            self.barMin, self.barMax = color_limits(self.runData, self.modTime, self.sampleRate, self.intyScale,
+                                                    self.percentiles[0], self.percentiles[1])
+
+        export_pdf(self.runData, self.filepath, self.modTime, self.sampleRate, self.retentionTime, self.shiftTime,
+                   self.colormap, self.width, self.height, self.intyScale, self.barMin, self.barMax,
+                   self.binX, self.binY, self.binMode, self.dpi, self.wavelengths)
+
+
+# current plot is drawn again as new figure, intensities are rasterized with dpi, axis and text stay vector graphics
 class SavePlotThread(Qc.QThread):
-    def __init__(self, fn):
+    def __init__(self, fn, plot_args, dpi=300):
         super().__init__()
         self.filepath = fn
+        self.plotArgs = plot_args
+        self.dpi = dpi
 
     def run(self):
+        figure = create_figure(**self.plotArgs)
+
         with PdfPages(self.filepath) as pp:
-            pp.savefig()
+            pp.savefig(figure, dpi=self.dpi, bbox_inches='tight')
 
 
 